@@ -1,16 +1,145 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, ValidationError
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Optional, Dict
+from pathlib import Path
+from collections import Counter
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, TypedDict, List, Optional, Dict
 import asyncio
+import hashlib
+import logging
 import json
 import os
+import re
 
+import httpx
+import orjson
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
+from google.genai import errors as genai_errors
 
 load_dotenv()
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.2)
+logger = logging.getLogger("ml-model")
+
+MODEL_NAME = "gemini-2.0-flash"
+# Bump when the proposal prompt changes so stale cached proposals are ignored
+PROMPT_VERSION = "v1"
+# Structured-output attempts before the proposal is marked as failed
+PROPOSAL_MAX_ATTEMPTS = 3
+# Caps on Gemini traffic for the whole account
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_RPM = int(os.getenv("GEMINI_MAX_RPM", "500"))
+# Processes sharing those caps. A single process unless server.py exports the count it launches
+ML_WORKERS = max(1, int(os.getenv("ML_WORKERS", "1")))
+if ML_WORKERS > min(GEMINI_MAX_CONCURRENCY, GEMINI_MAX_RPM):
+    logger.warning(
+        "ML_WORKERS=%d exceeds the Gemini caps; each worker keeps 1 slot, so the account limit will be exceeded",
+        ML_WORKERS
+    )
+# Each process enforces its even share of the account caps
+LLM_MAX_CONCURRENCY = max(1, GEMINI_MAX_CONCURRENCY // ML_WORKERS)
+LLM_MAX_RPM = max(1, GEMINI_MAX_RPM // ML_WORKERS)
+# Initial votes at least this lopsided, with every validator this confident, skip the debate
+DECISIVE_MARGIN = 3
+DECISIVE_MIN_CONFIDENCE = 8
+# Prompt budgets for re-injected validator text; tokens are estimated from length to avoid a
+# tokenizer dependency or a count_tokens round-trip
+CHARS_PER_TOKEN = 4
+CONCERNS_TOKEN_BUDGET = 300
+DEBATE_TOKEN_BUDGET = 800
+# Votes and debate arguments are short by design; the cap stops a rambling answer from running on
+VOTE_MAX_OUTPUT_TOKENS = 256
+# Streamed chunks searched for final-vote fields; a field split wider than this just disables the early exit
+STREAM_TAIL_CHUNKS = 4
+
+# Identical (model, prompt) calls are answered from disk instead of the network
+set_llm_cache(SQLiteCache(database_path=os.getenv("LLM_CACHE_PATH", ".langchain.db")))
+PROPOSAL_CACHE_DIR = Path(os.getenv("PROPOSAL_CACHE_DIR", Path.home() / ".gauntlet" / "cache"))
+
+# langchain-google-genai talks to Gemini through google-genai's httpx client; size its pool to the
+# concurrency cap and keep connections alive over HTTP/2 so calls reuse one TLS session
+GEMINI_CLIENT_ARGS = {
+    "http2": True,
+    "limits": httpx.Limits(max_connections=LLM_MAX_CONCURRENCY, max_keepalive_connections=LLM_MAX_CONCURRENCY),
+}
+
+llm = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=0.2, client_args=GEMINI_CLIENT_ARGS)
+# Validator calls only; proposal generation keeps the uncapped model
+vote_llm = llm.model_copy(update={"max_output_tokens": VOTE_MAX_OUTPUT_TOKENS})
+
+# Shared by every request so concurrent workflows queue locally instead of tripping 429 backoff
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_llm_rate_limiter = AsyncLimiter(LLM_MAX_RPM, 60)
+
+
+@asynccontextmanager
+async def _llm_slot():
+    """Wait for both a rate-limit token and a concurrency slot before calling Gemini."""
+    async with _llm_rate_limiter, _llm_semaphore:
+        yield
+
+# Static across runs, so built once and shared by every proposal request
+PROPOSAL_SYSTEM_MESSAGE = SystemMessage(content="You are a DAO assistant generating structured proposals.")
+
+# Fields of a (possibly still streaming) final-vote JSON answer
+_VOTE_FIELD_RE = re.compile(r'"vote"\s*:\s*"(APPROVE|REJECT)"', re.IGNORECASE)
+_CONFIDENCE_FIELD_RE = re.compile(r'"confidence"\s*:\s*(\d+)\s*[,}]')
+# Words long enough to carry meaning when comparing concerns with debate text
+_WORD_RE = re.compile(r"\w{4,}")
+
+# Expanded list of keywords for liberal fungibility detection
+MONETARY_KEYWORDS = [
+    # General financial terms
+    "fund", "reward", "grant", "payment", "budget", "payout", "compensation", "bounty", "incentive", "stipend",
+    "cost", "fee", "expense", "allocation", "disburse",
+    # Cryptocurrency and blockchain
+    "token", "stablecoin", "pyusd", "usdc", "dai", "eth", "matic", "coin", "asset", "nft", "share", "crypto",
+    # Financial operations
+    "treasury", "capital", "fiat", "vault", "reserve", "yield", "pool", "swap", "exchange", "loan", "borrow",
+    # Money transfer
+    "value transfer", "escrow", "transfer", "send", "receive"
+]
+# One alternation scans the text once; like the old `in` checks it matches substrings
+_MONETARY_RE = re.compile("|".join(map(re.escape, MONETARY_KEYWORDS)), re.IGNORECASE)
+
+
+def _fit_token_budget(texts: List[str], budget: int) -> List[str]:
+    """Keep texts in order until the estimated token budget would be exceeded."""
+    kept = []
+    used = 0
+    for text in texts:
+        used += len(text) // CHARS_PER_TOKEN + 1
+        if used > budget:
+            break
+        kept.append(text)
+    return kept
+
+
+class UpstreamUnavailableError(Exception):
+    """Gemini could not be reached or is overloaded, so the workflow cannot produce a proposal."""
+
+
+def _is_upstream_unavailable(exc: BaseException) -> bool:
+    """True for transport failures, timeouts, rate limits and 5xx answers, however deeply wrapped."""
+    while exc is not None:
+        if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, genai_errors.ServerError)):
+            return True
+        if isinstance(exc, genai_errors.APIError) and exc.code == 429:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def _parse_json_response(content: str) -> dict:
+    """Parse the JSON object in an LLM answer, ignoring code fences or prose around it."""
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in LLM response")
+    return orjson.loads(content[start:end + 1])
 
 
 
@@ -59,7 +188,7 @@ class WorkflowState(TypedDict):
 
 class DAOProposalGenerator:
     def __init__(self):
-        self.structured_llm = llm.with_structured_output(DAOProposalOutput)
+        self.structured_llm = llm.with_structured_output(DAOProposalOutput, include_raw=True)
         self.workflow = self._build_workflow()
         
         
@@ -86,12 +215,41 @@ class DAOProposalGenerator:
             }
         }
 
+        # Static per-validator prompt fragments, derived once instead of on every vote
+        for validator_id, info in self.validator_roles.items():
+            info["display_name"] = validator_id.replace("_", " ").title()
+            info["criteria_str"] = ", ".join(info["criteria"])
+
+        # Role, criteria and answer format never change, so they form a static system
+        # prefix per validator that the provider can cache; only the proposal varies
+        self._validator_system_messages = {
+            validator_id: SystemMessage(content=f"""Role: DAO {info['display_name']}. Focus: {info['focus']}. Criteria: {info['criteria_str']}.
+Vote on the proposal. Reply JSON only:
+{{"vote": "APPROVE"|"REJECT", "confidence": 1-10, "reasoning": "<=25 words", "concerns": ["<=3 short items"]}}""")
+            for validator_id, info in self.validator_roles.items()
+        }
+        self._final_vote_system_messages = {
+            validator_id: SystemMessage(content=f"""Role: {validator_id}. Re-vote after the minority's debate arguments; change your vote only if they raise something new and compelling.
+Reply JSON only:
+{{"vote": "APPROVE"|"REJECT", "confidence": 1-10, "reasoning": "<=25 words", "vote_changed": true|false}}""")
+            for validator_id in self.validator_roles
+        }
+
     
-    def _generate_proposal_node(self, state: WorkflowState) -> dict:
+    async def warmup(self) -> None:
+        """Open the Gemini connection so the first real request doesn't pay for the handshake."""
+        try:
+            # Bypass the response cache, otherwise every warmup after the first never reaches the network
+            async with _llm_slot():
+                await llm.model_copy(update={"cache": False}).ainvoke([HumanMessage(content="ping")])
+        except Exception as e:
+            logger.warning("Warmup call failed: %s", e)
+
+    async def _generate_proposal_node(self, state: WorkflowState) -> dict:
         inp = state["proposal_input"]
 
         messages = [
-            SystemMessage(content="You are a DAO assistant generating structured proposals."),
+            PROPOSAL_SYSTEM_MESSAGE,
             HumanMessage(content=f"""
                 Challenge ID: {inp['challenge_id']}
                 Description: {inp['challenge_text']}
@@ -104,13 +262,63 @@ class DAOProposalGenerator:
             """)
         ]
 
+        cache_key = self._proposal_cache_key(inp)
+        cached = self._load_cached_proposal(cache_key)
+        if cached is not None:
+            return {"generated_proposal": cached.model_dump(mode="json")}
+
+        error = None
+        for attempt in range(PROPOSAL_MAX_ATTEMPTS):
+            try:
+                async with _llm_slot():
+                    output = await self.structured_llm.ainvoke(messages)
+            except Exception as e:
+                # Without a proposal nothing downstream can run, so let the API answer 503
+                if _is_upstream_unavailable(e):
+                    raise UpstreamUnavailableError(MODEL_NAME) from e
+                return {"generated_proposal": {"error": str(e)}}
+
+            result = output["parsed"]
+            error = output["parsing_error"]
+            if result is not None and error is None:
+                self._store_cached_proposal(cache_key, result)
+                return {"generated_proposal": result.model_dump(mode="json")}
+
+            if attempt == PROPOSAL_MAX_ATTEMPTS - 1:
+                break
+            # Feed the bad output and its schema error back so the next attempt can correct it.
+            # A tool call is replayed as text, since no tool result will follow it
+            raw = output["raw"]
+            if raw is not None:
+                messages.append(
+                    AIMessage(content=orjson.dumps(raw.tool_calls[0]["args"]).decode()) if raw.tool_calls else raw
+                )
+            error = error or "no structured output was returned"
+            messages.append(HumanMessage(content=f"Your output had error: {error}. Fix and retry."))
+            await asyncio.sleep(1.0 * (attempt + 1))
+
+        return {"generated_proposal": {"error": str(error or "no structured output was returned")}}
+
+    @staticmethod
+    def _proposal_cache_key(inp: dict) -> str:
+        payload = json.dumps(inp, sort_keys=True)
+        return hashlib.sha256(f"{MODEL_NAME}|{PROMPT_VERSION}|{payload}".encode()).hexdigest()
+
+    @staticmethod
+    def _load_cached_proposal(key: str) -> Optional[DAOProposalOutput]:
+        path = PROPOSAL_CACHE_DIR / f"{key}.json"
         try:
-            result = self.structured_llm.invoke(messages)
-            state["generated_proposal"] = result.dict()
-        except Exception as e:
-            state["generated_proposal"] = {"error": str(e)}
+            return DAOProposalOutput.model_validate_json(path.read_text())
+        except (OSError, ValidationError):
+            return None
 
-        return state
+    @staticmethod
+    def _store_cached_proposal(key: str, proposal: DAOProposalOutput) -> None:
+        try:
+            PROPOSAL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            (PROPOSAL_CACHE_DIR / f"{key}.json").write_text(proposal.model_dump_json())
+        except OSError:
+            pass
 
     
     async def _parallel_initial_vote_node(self, state: WorkflowState) -> dict:
@@ -118,52 +326,27 @@ class DAOProposalGenerator:
         proposal = state["generated_proposal"]
         
         if "error" in proposal:
-            state["validator_votes"] = []
-            return state
-
-        async def get_validator_vote(validator_id: str, role_info: dict) -> ValidatorVote:
-            prompt = f"""
-You are a DAO {validator_id.replace('_', ' ').title()}.
+            return {"validator_votes": []}
 
-**Proposal Summary:**
-Title: {proposal.get('title', 'N/A')}
+        # Shared by every validator, so render it once per proposal
+        proposal_summary = f"""Title: {proposal.get('title', 'N/A')}
 Abstract: {proposal.get('abstract', 'N/A')}
 Motivation: {proposal.get('motivation', 'N/A')}
-Actions: {proposal.get('actions', 'N/A')}
-Expected Impact: {proposal.get('expected_impact', 'N/A')}
-Requested Funds: {proposal.get('requested_funds', 'N/A')}
-
-**Your Focus Area:** {role_info['focus']}
-**Key Criteria:** {', '.join(role_info['criteria'])}
-
-Based on your expertise, provide your vote:
-1. Vote: APPROVE or REJECT
-2. Confidence: 1-10 (how certain are you?)
-3. Reasoning: Brief explanation
-4. Concerns: List any specific issues
-
-Respond in JSON format:
-{{
-    "vote": "APPROVE" or "REJECT",
-    "confidence": <1-10>,
-    "reasoning": "<your reasoning>",
-    "concerns": ["<concern1>", "<concern2>", ...]
-}}
-"""
+Actions: {'; '.join(proposal.get('actions') or []) or 'N/A'}
+Impact: {proposal.get('expected_impact', 'N/A')}
+Funds: {proposal.get('requested_funds', 'N/A')}"""
+
+        async def get_validator_vote(validator_id: str, role_info: dict, proposal_summary: str) -> ValidatorVote:
+            messages = [self._validator_system_messages[validator_id], HumanMessage(content=proposal_summary)]
             
             try:
-                response = await llm.ainvoke([HumanMessage(content=prompt)])
-                content = response.content.strip()
-                
-                if content.startswith("```json"):
-                    content = content[7:]
-                if content.startswith("```"):
-                    content = content[3:]
-                if content.endswith("```"):
-                    content = content[:-3]
-                content = content.strip()
-                
-                vote_data = json.loads(content)
+                async with _llm_slot():
+                    response = await vote_llm.ainvoke(messages)
+                vote_data = _parse_json_response(response.content)
+                # Normalized once here so later nodes can treat every concern as a string
+                concerns = vote_data.get("concerns") or []
+                if not isinstance(concerns, list):
+                    concerns = [concerns]
                 
                 return {
                     "validator_id": validator_id,
@@ -171,7 +354,7 @@ Respond in JSON format:
                     "vote": vote_data.get("vote", "REJECT"),
                     "confidence": max(1, min(10, vote_data.get("confidence", 5))),
                     "reasoning": vote_data.get("reasoning", "No reasoning provided"),
-                    "concerns": vote_data.get("concerns", [])
+                    "concerns": [str(c) for c in concerns]
                 }
             except Exception as e:
                 return {
@@ -185,14 +368,12 @@ Respond in JSON format:
         
         
         vote_tasks = [
-            get_validator_vote(validator_id, role_info)
+            get_validator_vote(validator_id, role_info, proposal_summary)
             for validator_id, role_info in self.validator_roles.items()
         ]
         
         votes = await asyncio.gather(*vote_tasks)
-        state["validator_votes"] = votes
-        
-        return state
+        return {"validator_votes": votes}
 
     
     async def _debate_round_node(self, state: WorkflowState) -> dict:
@@ -200,142 +381,145 @@ Respond in JSON format:
         votes = state["validator_votes"]
         
         if not votes:
-            state["debate_arguments"] = []
-            return state
+            return {"debate_arguments": []}
         
         # Calculate current sentiment
-        approve_count = sum(1 for v in votes if v["vote"] == "APPROVE")
+        approve_count = Counter(v["vote"] for v in votes)["APPROVE"]
         reject_count = len(votes) - approve_count
         
         
         if approve_count == reject_count:
-            state["debate_arguments"] = []
-            return state
+            return {"debate_arguments": []}
         
         minority_side = "REJECT" if approve_count > reject_count else "APPROVE"
         minority_validators = [v for v in votes if v["vote"] == minority_side]
         
         if not minority_validators or len(minority_validators) == len(votes):
-            state["debate_arguments"] = []
-            return state
+            return {"debate_arguments": []}
         
         
+        # Validators often raise the same concern; send each one to the debate prompt once,
+        # most confident validators first so the token budget drops the weakest concerns
         all_concerns = []
-        for v in votes:
-            all_concerns.extend(v.get("concerns", []))
-        
-        debate_arguments = []
-        
-        for validator in minority_validators:
-            prompt = f"""
-You are {validator['validator_id']} and you voted {validator['vote']} with confidence {validator['confidence']}/10.
-
-The majority is leaning toward {('REJECT' if minority_side == 'APPROVE' else 'APPROVE')}.
-
-Your original reasoning: {validator['reasoning']}
+        seen_concerns = set()
+        for v in sorted(votes, key=lambda v: v["confidence"], reverse=True):
+            for concern in v.get("concerns", []):
+                key = concern.lower()
+                if key not in seen_concerns:
+                    seen_concerns.add(key)
+                    all_concerns.append(concern)
+        all_concerns = _fit_token_budget(all_concerns, CONCERNS_TOKEN_BUDGET)
+        
+        async def get_debate_argument(validator: ValidatorVote) -> dict:
+            prompt = f"""Role: {validator['validator_id']}, voted {validator['vote']} ({validator['confidence']}/10); majority leans {('REJECT' if minority_side == 'APPROVE' else 'APPROVE')}.
+Your reasoning: {validator['reasoning']}
 Your concerns: {validator.get('concerns', [])}
-
-All validators' concerns: {all_concerns[:10]}
-
-Present a compelling argument to sway the majority. Be specific and constructive.
-Keep it under 100 words.
-"""
+All concerns: {all_concerns[:10]}
+Argue specifically to sway the majority, under 60 words."""
             
             try:
-                response = await llm.ainvoke([HumanMessage(content=prompt)])
+                async with _llm_slot():
+                    response = await vote_llm.ainvoke([HumanMessage(content=prompt)])
                 argument = response.content.strip()
-                
-                debate_arguments.append({
-                    "validator_id": validator["validator_id"],
-                    "side": validator["vote"],
-                    "original_confidence": validator["confidence"],
-                    "argument": argument
-                })
             except Exception as e:
-                debate_arguments.append({
-                    "validator_id": validator["validator_id"],
-                    "side": validator["vote"],
-                    "original_confidence": validator["confidence"],
-                    "argument": f"Error generating argument: {str(e)}"
-                })
+                argument = f"Error generating argument: {str(e)}"
+
+            return {
+                "validator_id": validator["validator_id"],
+                "side": validator["vote"],
+                "original_confidence": validator["confidence"],
+                "argument": argument
+            }
+        
+        # Minority validators argue independently, so ask them in parallel
+        debate_tasks = [get_debate_argument(v) for v in minority_validators]
+        debate_arguments = await asyncio.gather(*debate_tasks)
         
-        state["debate_arguments"] = debate_arguments
-        return state
+        return {"debate_arguments": debate_arguments}
 
     
     async def _final_vote_node(self, state: WorkflowState) -> dict:
         """Re-vote after hearing debate arguments - validators can change their mind"""
         votes = state["validator_votes"]
         debate_args = state.get("debate_arguments", [])
-        proposal = state["generated_proposal"]
         
         if not votes:
-            state["final_votes"] = []
-            state["weighted_score"] = 0.0
-            state["final_decision"] = "REJECTED"
-            return state
+            return {"final_votes": [], "weighted_score": 0.0, "final_decision": "REJECTED"}
         
         
         if not debate_args:
-            state["final_votes"] = votes
             weighted_score = sum(
                 (1 if v["vote"] == "APPROVE" else -1) * (v["confidence"] / 10)
                 for v in votes
             )
-            state["weighted_score"] = round(weighted_score, 2)
-            state["final_decision"] = "APPROVED" if weighted_score > 0 else "REJECTED"
-            return state
+            return {
+                "final_votes": votes,
+                "weighted_score": round(weighted_score, 2),
+                "final_decision": "APPROVED" if weighted_score > 0 else "REJECTED"
+            }
         
         
-        debate_summary = "\n\n".join([
+        debate_summary = "\n\n".join(_fit_token_budget([
             f"{arg['validator_id']} ({arg['side']}, confidence {arg['original_confidence']}/10):\n{arg['argument']}"
-            for arg in debate_args
-        ])
+            for arg in sorted(debate_args, key=lambda arg: arg["original_confidence"], reverse=True)
+        ], DEBATE_TOKEN_BUDGET))
+        debate_tokens = set(_WORD_RE.findall(debate_summary.lower()))
         
         async def get_final_vote(original_vote: ValidatorVote) -> ValidatorVote:
-            prompt = f"""
-You are {original_vote['validator_id']}.
+            # Skip the re-vote when the debate never touched this validator's concerns
+            concern_tokens = set(_WORD_RE.findall(" ".join(original_vote.get("concerns", [])).lower()))
+            if concern_tokens.isdisjoint(debate_tokens):
+                return original_vote
 
-Your original vote: {original_vote['vote']} (confidence: {original_vote['confidence']}/10)
+            messages = [
+                self._final_vote_system_messages[original_vote["validator_id"]],
+                HumanMessage(content=f"""
+Your vote: {original_vote['vote']} ({original_vote['confidence']}/10)
 Your reasoning: {original_vote['reasoning']}
 
-After the debate, minority validators presented these arguments:
+Minority debate arguments:
 {debate_summary}
-
-Do you change your vote or maintain it? Consider:
-1. Were the debate arguments compelling?
-2. Did they address concerns you hadn't considered?
-3. Is there new information that changes your assessment?
-
-Respond in JSON:
-{{
-    "vote": "APPROVE" or "REJECT",
-    "confidence": <1-10>,
-    "reasoning": "<updated reasoning>",
-    "vote_changed": true or false
-}}
-"""
+""")
+            ]
             
             try:
-                response = await llm.ainvoke([HumanMessage(content=prompt)])
-                content = response.content.strip()
-                
-                if content.startswith("```json"):
-                    content = content[7:]
-                if content.startswith("```"):
-                    content = content[3:]
-                if content.endswith("```"):
-                    content = content[:-3]
-                content = content.strip()
-                
-                new_vote_data = json.loads(content)
+                # An unchanged vote keeps its original reasoning, so once vote + confidence have
+                # arrived and the vote stands, the rest of the answer isn't needed
+                chunks = []
+                vote_match = confidence_match = None
+                async with _llm_slot():
+                    async with aclosing(vote_llm.astream(messages)) as stream:
+                        async for chunk in stream:
+                            chunks.append(chunk.content)
+                            # Only the last few chunks can hold a field that just completed
+                            tail = "".join(chunks[-STREAM_TAIL_CHUNKS:])
+                            vote_match = vote_match or _VOTE_FIELD_RE.search(tail)
+                            confidence_match = confidence_match or _CONFIDENCE_FIELD_RE.search(tail)
+                            if (vote_match and confidence_match
+                                    and vote_match.group(1).upper() == original_vote["vote"]):
+                                break
+
+                try:
+                    new_vote_data = _parse_json_response("".join(chunks))
+                except ValueError:
+                    if not (vote_match and confidence_match):
+                        raise
+                    new_vote_data = {
+                        "vote": vote_match.group(1).upper(),
+                        "confidence": int(confidence_match.group(1))
+                    }
+                new_vote = new_vote_data.get("vote", original_vote["vote"])
                 
                 return {
                     "validator_id": original_vote["validator_id"],
                     "role": original_vote["role"],
-                    "vote": new_vote_data.get("vote", original_vote["vote"]),
+                    "vote": new_vote,
                     "confidence": max(1, min(10, new_vote_data.get("confidence", original_vote["confidence"]))),
-                    "reasoning": new_vote_data.get("reasoning", original_vote["reasoning"]),
+                    # Never pair a flipped vote with reasoning written for the old one
+                    "reasoning": new_vote_data.get("reasoning") or (
+                        original_vote["reasoning"] if new_vote == original_vote["vote"]
+                        else "Vote changed after debate; no updated reasoning returned"
+                    ),
                     "concerns": original_vote.get("concerns", [])
                 }
             except:
@@ -351,14 +535,14 @@ Respond in JSON:
             for v in final_votes
         )
         
-        state["final_votes"] = final_votes
-        state["weighted_score"] = round(weighted_score, 2)
-        state["final_decision"] = "APPROVED" if weighted_score > 0 else "REJECTED"
-        
-        return state
+        return {
+            "final_votes": final_votes,
+            "weighted_score": round(weighted_score, 2),
+            "final_decision": "APPROVED" if weighted_score > 0 else "REJECTED"
+        }
 
     
-    def _determine_fungibility_node(self, state: WorkflowState) -> WorkflowState:
+    def _determine_fungibility_node(self, state: WorkflowState) -> dict:
         """
         Decide whether the proposal is fungible based on final decision and monetary nature.
         Fungible = "yes" if approved + monetary keywords present.
@@ -368,38 +552,31 @@ Respond in JSON:
         input_data = state.get("proposal_input", {})
 
         if decision == "REJECTED" or not proposal or "error" in proposal:
-            state["fungible"] = "no"
-            return state
+            return {"fungible": "no"}
 
         # Collect text from both the original input and the generated proposal
-        text_parts = [
-            str(proposal.get(k, "")).lower() 
-            for k in ("title", "abstract", "motivation", "actions", "expected_impact", "requested_funds")
+        # Check field by field and stop at the first monetary hit instead of joining everything
+        fields = [
+            proposal.get(k) or ""
+            for k in ("title", "abstract", "motivation", "expected_impact", "requested_funds")
         ]
+        # Scan action items directly rather than the repr() of the whole list
+        fields.extend(proposal.get("actions") or [])
         # Include the original challenge text as it's the most direct indicator
-        text_parts.append(input_data.get("challenge_text", "").lower())
-        
-        text = " ".join(text_parts)
-
-        # Expanded list of keywords for liberal fungibility detection
-        monetary_keywords = [
-            # General financial terms
-            "fund", "reward", "grant", "payment", "budget", "payout", "compensation", "bounty", "incentive", "stipend",
-            "cost", "fee", "expense", "allocation", "disburse",
-            # Cryptocurrency and blockchain
-            "token", "stablecoin", "pyusd", "usdc", "dai", "eth", "matic", "coin", "asset", "nft", "share", "crypto",
-            # Financial operations
-            "treasury", "capital", "fiat", "vault", "reserve", "yield", "pool", "swap", "exchange", "loan", "borrow",
-            # Money transfer
-            "value transfer", "escrow", "transfer", "send", "receive"
-        ]
-        
-        has_monetary = any(keyword in text for keyword in monetary_keywords)
-        state["fungible"] = "yes" if has_monetary else "no"
+        fields.append(input_data.get("challenge_text", ""))
 
-        return state
+        has_monetary = any(_MONETARY_RE.search(field) for field in fields)
+        return {"fungible": "yes" if has_monetary else "no"}
 
    
+    @staticmethod
+    def _is_decisive(votes: List[ValidatorVote]) -> bool:
+        if not votes:
+            return False
+        approve_count = Counter(v["vote"] for v in votes)["APPROVE"]
+        margin = abs(2 * approve_count - len(votes))
+        return margin >= DECISIVE_MARGIN and min(v["confidence"] for v in votes) >= DECISIVE_MIN_CONFIDENCE
+
     def _build_workflow(self):
         workflow = StateGraph(WorkflowState)
         
@@ -410,8 +587,18 @@ Respond in JSON:
         workflow.add_node("determine_fungibility", self._determine_fungibility_node)
 
         workflow.set_entry_point("generate_proposal")
-        workflow.add_edge("generate_proposal", "parallel_initial_vote")
-        workflow.add_edge("parallel_initial_vote", "debate_round")
+        # A failed proposal can only be rejected, so skip straight past the voting nodes
+        workflow.add_conditional_edges(
+            "generate_proposal",
+            lambda s: "err" if "error" in s["generated_proposal"] else "ok",
+            {"err": "determine_fungibility", "ok": "parallel_initial_vote"}
+        )
+        # Skip the debate for clear-cut initial votes; with no arguments final_vote just scores them
+        workflow.add_conditional_edges(
+            "parallel_initial_vote",
+            lambda s: "skip" if self._is_decisive(s["validator_votes"]) else "debate",
+            {"skip": "final_vote", "debate": "debate_round"}
+        )
         workflow.add_edge("debate_round", "final_vote")
         workflow.add_edge("final_vote", "determine_fungibility")
         workflow.add_edge("determine_fungibility", END)
@@ -419,20 +606,25 @@ Respond in JSON:
         return workflow.compile()
 
     
-    async def run(self, proposal_input: DAOProposalInput) -> dict:
-        """Execute the complete DAO proposal workflow"""
-        initial_state = {
-            "proposal_input": proposal_input.dict(),
+    @staticmethod
+    def _initial_state(proposal_input: DAOProposalInput) -> WorkflowState:
+        return {
+            "proposal_input": proposal_input.model_dump(mode="json"),
             "generated_proposal": {},
             "validator_votes": [],
             "debate_arguments": [],
             "final_votes": [],
-            "final_decision": "",
+            "final_decision": "REJECTED",
             "weighted_score": 0.0,
             "fungible": "",
         }
-        
-        final_state = await self.workflow.ainvoke(initial_state)
+
+    @staticmethod
+    def _summarize(final_state: WorkflowState) -> dict:
+        initial_votes = final_state["validator_votes"]
+        final_votes = final_state["final_votes"]
+        initial_counts = Counter(v["vote"] for v in initial_votes)
+        final_counts = Counter(v["vote"] for v in final_votes)
         
         return {
             "proposal": final_state["generated_proposal"],
@@ -443,17 +635,33 @@ Respond in JSON:
             "debate_arguments": final_state["debate_arguments"],
             "final_votes": final_state["final_votes"],
             "voting_summary": {
-                "initial_approve": sum(1 for v in final_state["validator_votes"] if v["vote"] == "APPROVE"),
-                "initial_reject": sum(1 for v in final_state["validator_votes"] if v["vote"] == "REJECT"),
-                "final_approve": sum(1 for v in final_state["final_votes"] if v["vote"] == "APPROVE"),
-                "final_reject": sum(1 for v in final_state["final_votes"] if v["vote"] == "REJECT"),
+                "initial_approve": initial_counts["APPROVE"],
+                "initial_reject": initial_counts["REJECT"],
+                "final_approve": final_counts["APPROVE"],
+                "final_reject": final_counts["REJECT"],
                 "votes_changed": sum(
-                    1 for i, v in enumerate(final_state["final_votes"])
-                    if v["vote"] != final_state["validator_votes"][i]["vote"]
+                    initial["vote"] != final["vote"]
+                    for initial, final in zip(initial_votes, final_votes)
                 )
             }
         }
 
+    async def run(self, proposal_input: DAOProposalInput) -> dict:
+        """Execute the complete DAO proposal workflow"""
+        final_state = await self.workflow.ainvoke(self._initial_state(proposal_input))
+        return self._summarize(final_state)
+
+    async def run_stream(self, proposal_input: DAOProposalInput) -> AsyncIterator[dict]:
+        """
+        Execute the workflow, yielding each node's update as it completes.
+        Events are {"stage": <node name>, **update}, followed by {"stage": "final", **run() result}.
+        """
+        state = self._initial_state(proposal_input)
+        async for update in self.workflow.astream(state, stream_mode="updates"):
+            for node, values in update.items():
+                state.update(values)
+                yield {"stage": node, **values}
+        yield {"stage": "final", **self._summarize(state)}
 
 async def main():
     generator = DAOProposalGenerator()
@@ -1,11 +1,54 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from main import DAOProposalGenerator, DAOProposalInput
+from fastapi.responses import StreamingResponse
+from main import _MONETARY_RE, GEMINI_MAX_CONCURRENCY, GEMINI_MAX_RPM, DAOProposalGenerator, DAOProposalInput, UpstreamUnavailableError
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pydantic import BaseModel
+from typing import Annotated, List, Optional, Union
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+
+import msgspec
+import orjson
+import redis.asyncio as redis
+
+# Only the app's own logger is configured, so library loggers (httpx logs every Gemini call) stay quiet.
+# `python server.py` imports this file twice per process (__main__, then server:app), hence the guard
+logger = logging.getLogger("ml-model")
+if not logger.handlers:
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("[ML Model] %(levelname)s %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Built per worker at startup rather than at import, then warmed before serving traffic
+    app.state.generator = DAOProposalGenerator()
+    await app.state.generator.warmup()
+    # Optional result cache shared by every worker and surviving restarts; off unless REDIS_URL is set
+    redis_url = os.getenv("REDIS_URL")
+    app.state.redis = redis.Redis.from_pool(
+        redis.BlockingConnectionPool.from_url(redis_url, max_connections=REDIS_POOL_SIZE)
+    ) if redis_url else None
+    yield
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+
 
 app = FastAPI(
     title="DAO Proposal Generator API",
     description="Multi-agent DAO governance system with parallel voting and debate",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 
@@ -28,31 +71,234 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-generator = DAOProposalGenerator()
+# Keywords that mark a challenge as fundible, compiled into one alternation scanned once per request
+MONEY_KEYWORDS = ['$', 'usd', 'pyusd', 'usdc', 'fund', 'reward', 'payment', 'prize', 'money', 'pay', 'dollar']
+_MONEY_RE = re.compile("|".join(map(re.escape, MONEY_KEYWORDS)), re.IGNORECASE)
 
+# Domain keywords in priority order: when several domains match, the earliest listed wins
+DOMAIN_KEYWORDS = {
+    "DeFi": ['defi', 'lending', 'protocol', 'swap', 'liquidity', 'yield'],
+    "NFT": ['nft', 'token', 'mint', 'collectible', 'art'],
+    "Gaming": ['game', 'gaming', 'play', 'metaverse'],
+    "DAO": ['dao', 'governance', 'voting', 'proposal'],
+    "FinTech": ['finance', 'fintech', 'banking', 'payment'],
+    "Blockchain": ['smart contract', 'blockchain', 'web3', 'dapp'],
+}
+# One named group per domain, so a single scan reports which domains occur. The lookahead
+# keeps matches from consuming text, so overlapping keywords ("art" in "smart contract") still count
+_DOMAIN_RE = re.compile("(?=" + "|".join(
+    f"(?P<{name}>{'|'.join(map(re.escape, keywords))})"
+    for name, keywords in DOMAIN_KEYWORDS.items()
+) + ")", re.IGNORECASE)
+_DOMAIN_PRIORITY = list(DOMAIN_KEYWORDS)
 
-@app.get("/")
-def home():
+
+def _classify_domain(text: str) -> str:
+    best = len(_DOMAIN_PRIORITY)
+    for match in _DOMAIN_RE.finditer(text):
+        best = min(best, _DOMAIN_PRIORITY.index(match.lastgroup))
+        if best == 0:
+            break
+    return _DOMAIN_PRIORITY[best] if best < len(_DOMAIN_PRIORITY) else "General"
+
+
+def _is_fundible(req: Union[DAOProposalInput, "ClassifyInput"]) -> bool:
+    return _MONEY_RE.search(req.challenge_text) is not None or req.requested_reward > 0
+
+
+def _can_skip_workflow(req: DAOProposalInput) -> bool:
+    """Neither /classify's keywords nor the workflow's own monetary keywords find anything to fund."""
+    return not _is_fundible(req) and _MONETARY_RE.search(req.challenge_text) is None
+
+
+def _keyword_rejection(req: DAOProposalInput) -> dict:
+    """Workflow-shaped rejection for challenges the keyword classifier already rules out."""
     return {
-        "service": "DAO Proposal Generator",
-        "status": "running",
-        "version": "2.0.0",
-        "features": [
-            "Parallel multi-agent voting",
-            "Specialized validator roles",
-            "Debate rounds",
-            "Confidence-weighted decisions"
-        ]
+        "proposal": {
+            "title": "Insufficient monetary content",
+            "abstract": "The challenge requests no reward and mentions no funding, so no proposal was generated.",
+            "motivation": "",
+            "actions": [],
+            "expected_impact": "",
+            "audit_references": [],
+            "requested_funds": None,
+            "domain": _classify_domain(req.challenge_text),
+            "proposer": req.proposer_wallet
+        },
+        "decision": "REJECTED",
+        "weighted_score": 0.0,
+        "fungible": "no",
+        "initial_votes": [],
+        "debate_arguments": [],
+        "final_votes": [],
+        "voting_summary": {
+            "initial_approve": 0,
+            "initial_reject": 0,
+            "final_approve": 0,
+            "final_reject": 0,
+            "votes_changed": 0
+        }
     }
 
 
+# Recent workflow results keyed by request hash, so retries and UI refreshes skip the LLM
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 3600
+_result_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+
+def _result_cache_key(req: DAOProposalInput) -> str:
+    return hashlib.blake2b(req.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+def _result_cache_get(key: str) -> Optional[dict]:
+    entry = _result_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, result = entry
+    if time.monotonic() - stored_at > RESULT_CACHE_TTL:
+        del _result_cache[key]
+        return None
+    _result_cache.move_to_end(key)
+    return result
+
+
+def _result_cache_put(key: str, result: dict) -> None:
+    _result_cache[key] = (time.monotonic(), result)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+
+
+# Second tier behind the per-worker cache. Redis failures count as misses so an outage only costs LLM calls
+REDIS_KEY_PREFIX = "proposal:"
+
+
+async def _shared_cache_get(r: Optional[redis.Redis], key: str) -> Optional[dict]:
+    if r is None:
+        return None
+    try:
+        cached = await r.get(REDIS_KEY_PREFIX + key)
+        if cached is None:
+            return None
+        result = orjson.loads(cached)
+    except (redis.RedisError, orjson.JSONDecodeError):
+        logger.warning("Redis read failed, treating as cache miss", exc_info=True)
+        return None
+    _result_cache_put(key, result)
+    return result
+
+
+async def _shared_cache_put(r: Optional[redis.Redis], key: str, result: dict) -> None:
+    _result_cache_put(key, result)
+    if r is None:
+        return
+    try:
+        await r.setex(REDIS_KEY_PREFIX + key, RESULT_CACHE_TTL, orjson.dumps(result))
+    except redis.RedisError:
+        logger.warning("Redis write failed, result cached in this worker only", exc_info=True)
+
+
+# Workflow runs in progress, so identical concurrent requests share one run instead of each starting their own
+_inflight_runs: "dict[str, asyncio.Task]" = {}
+
+# Caps whole workflow runs per worker; requests beyond it wait here instead of piling up behind the LLM limiter
+GEN_CONCURRENCY = int(os.getenv("GEN_CONCURRENCY", "8"))
+_generation_semaphore = asyncio.Semaphore(GEN_CONCURRENCY)
+# Per-worker Redis pool: each request holds at most one connection, and callers wait for a free
+# one rather than erroring, so a couple per generation slot is enough regardless of worker count
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 2 * GEN_CONCURRENCY))
+
+
+async def _run_bounded(generator: DAOProposalGenerator, req: DAOProposalInput) -> dict:
+    async with _generation_semaphore:
+        return await generator.run(req)
+
+
+async def _run_coalesced(generator: DAOProposalGenerator, key: str, req: DAOProposalInput) -> dict:
+    task = _inflight_runs.get(key)
+    if task is None:
+        task = asyncio.create_task(_run_bounded(generator, req))
+        _inflight_runs[key] = task
+        task.add_done_callback(lambda _: _inflight_runs.pop(key, None))
+    # Shielded so one client disconnecting doesn't cancel the run for the others
+    return await asyncio.shield(task)
+
+
+# Gemini outages get a constant 503 rather than a formatted error body
+UPSTREAM_UNAVAILABLE = {"error": "upstream unavailable", "message": "The model backend is unavailable, retry later"}
+
+
+# Static bodies, built once; async handlers so probes don't go through the threadpool
+HOME_RESPONSE = {
+    "service": "DAO Proposal Generator",
+    "status": "running",
+    "version": "2.0.0",
+    "features": [
+        "Parallel multi-agent voting",
+        "Specialized validator roles",
+        "Debate rounds",
+        "Confidence-weighted decisions"
+    ]
+}
+HEALTH_RESPONSE = {"status": "healthy", "validators": 5, "voting_phases": 3}
+
+
+@app.get("/")
+async def home():
+    return HOME_RESPONSE
+
+
 @app.get("/health")
-def health_check():
-    return {"status": "healthy", "validators": 5, "voting_phases": 3}
+async def health_check():
+    return HEALTH_RESPONSE
 
 
-@app.post("/classify")
-async def classify_challenge(req: DAOProposalInput):
+# msgspec counterpart of pydantic's HttpUrl: an absolute http(s) URL with a host, at most 2083 chars
+HttpUrlStr = Annotated[str, msgspec.Meta(pattern=r"(?i)^https?://[^\s/?#]+[^\s]*$", max_length=2083)]
+
+
+class ClassifyInput(msgspec.Struct):
+    """DAOProposalInput fields as /classify reads them, decoded by msgspec instead of pydantic."""
+    challenge_id: str
+    challenge_text: str
+    requested_reward: float
+    proposer_wallet: Optional[str] = None
+    urgency_level: Optional[str] = "medium"
+    supporting_links: Optional[List[HttpUrlStr]] = []
+
+
+async def _parse_classify_input(request: Request) -> ClassifyInput:
+    try:
+        return msgspec.json.decode(await request.body(), type=ClassifyInput, strict=False)
+    except msgspec.DecodeError as e:
+        raise RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": str(e), "input": None}])
+
+
+class ClassifyVotingSummary(BaseModel):
+    initial_approve: int
+    initial_reject: int
+
+
+class ClassifyMetadata(BaseModel):
+    voting_summary: ClassifyVotingSummary
+    weighted_score: float
+
+
+class ClassifyResponse(BaseModel):
+    success: bool
+    domain: str
+    fundible: str
+    decision: str
+    metadata: ClassifyMetadata
+
+
+# Body is parsed by the dependency, so the schema is attached by hand to keep /docs accurate
+@app.post("/classify", response_model=ClassifyResponse, openapi_extra={"requestBody": {
+    "required": True,
+    "content": {"application/json": {"schema": DAOProposalInput.model_json_schema()}}
+}})
+async def classify_challenge(req: ClassifyInput = Depends(_parse_classify_input)):
     """
     Classify challenge for fundibility and domain.
     This endpoint is called by the backend after challenge creation.
@@ -62,34 +308,19 @@ async def classify_challenge(req: DAOProposalInput):
     FAST MODE: Using keyword-based classification for speed
     """
     try:
-        print(f"[ML Model] Received classification request for challenge: {req.challenge_id}")
-        print(f"[ML Model] Challenge text: {req.challenge_text[:100]}...")
+        logger.info("Received classification request for challenge: %s", req.challenge_id)
+        logger.debug("Challenge text: %.100s...", req.challenge_text)
         
         # Fast keyword-based classification
-        text_lower = req.challenge_text.lower()
-        
         # Check fundibility based on monetary keywords
-        money_keywords = ['$', 'usd', 'pyusd', 'usdc', 'fund', 'reward', 'payment', 'prize', 'money', 'pay', 'dollar']
-        is_fundible = any(keyword in text_lower for keyword in money_keywords) or req.requested_reward > 0
+        is_fundible = _is_fundible(req)
         
         # Determine domain based on keywords
-        domain = "General"
-        if any(word in text_lower for word in ['defi', 'lending', 'protocol', 'swap', 'liquidity', 'yield']):
-            domain = "DeFi"
-        elif any(word in text_lower for word in ['nft', 'token', 'mint', 'collectible', 'art']):
-            domain = "NFT"
-        elif any(word in text_lower for word in ['game', 'gaming', 'play', 'metaverse']):
-            domain = "Gaming"
-        elif any(word in text_lower for word in ['dao', 'governance', 'voting', 'proposal']):
-            domain = "DAO"
-        elif any(word in text_lower for word in ['finance', 'fintech', 'banking', 'payment']):
-            domain = "FinTech"
-        elif any(word in text_lower for word in ['smart contract', 'blockchain', 'web3', 'dapp']):
-            domain = "Blockchain"
+        domain = _classify_domain(req.challenge_text)
         
         fundible = "yes" if is_fundible else "no"
         
-        print(f"[ML Model] Classification complete: domain={domain}, fundible={fundible}")
+        logger.info("Classification complete: domain=%s, fundible=%s", domain, fundible)
         
         return {
             "success": True,
@@ -106,7 +337,7 @@ async def classify_challenge(req: DAOProposalInput):
         }
 
     except Exception as e:
-        print(f"[ML Model] Error during classification: {str(e)}")
+        logger.exception("Classification failed")
         raise HTTPException(
             status_code=500,
             detail={
@@ -116,59 +347,162 @@ async def classify_challenge(req: DAOProposalInput):
         )
 
 
-@app.post("/generate_proposal")
-async def generate_proposal(req: DAOProposalInput):
+class VoteCounts(BaseModel):
+    approve: int
+    reject: int
+
+
+class VotingResults(BaseModel):
+    final_decision: str
+    weighted_score: float
+    initial_votes: VoteCounts
+    final_votes: VoteCounts
+    votes_changed: int
+    debate_occurred: bool
+
+
+class ProposalDetails(BaseModel):
+    title: str
+    abstract: str
+    requested_funds: Optional[str] = None
+    proposer: Optional[str] = None
+
+
+class ValidatorConfidence(BaseModel):
+    validator: str
+    role: str
+    confidence: Union[int, float]
+
+
+class ValidatorConsensus(BaseModel):
+    confidence_levels: List[ValidatorConfidence]
+
+
+class ProposalMetadata(BaseModel):
+    voting_results: VotingResults
+    proposal_details: ProposalDetails
+    validator_consensus: ValidatorConsensus
+
+
+class ProposalResponse(BaseModel):
+    success: bool
+    domain: str
+    fungible: str
+    proposal: dict
+    metadata: ProposalMetadata
+
+
+def _proposal_response(req: DAOProposalInput, result: dict) -> dict:
+    proposal = result.get("proposal") or {}
+    summary = result.get("voting_summary") or {}
+    
+    metadata = {
+        "voting_results": {
+            "final_decision": result.get("decision", "REJECTED"),
+            "weighted_score": result.get("weighted_score", 0.0),
+            "initial_votes": {
+                "approve": summary.get("initial_approve", 0),
+                "reject": summary.get("initial_reject", 0)
+            },
+            "final_votes": {
+                "approve": summary.get("final_approve", 0),
+                "reject": summary.get("final_reject", 0)
+            },
+            "votes_changed": summary.get("votes_changed", 0),
+            "debate_occurred": bool(result.get("debate_arguments"))
+        },
+        "proposal_details": {
+            "title": proposal.get("title", ""),
+            "abstract": proposal.get("abstract", ""),
+            "requested_funds": proposal.get("requested_funds"),
+            "proposer": proposal.get("proposer", req.proposer_wallet)
+        },
+        "validator_consensus": {
+            # Final votes are always complete ValidatorVote dicts, so index them directly
+            "confidence_levels": [
+                {"validator": v["validator_id"], "role": v["role"], "confidence": v["confidence"]}
+                for v in result.get("final_votes") or ()
+            ]
+        }
+    }
+    
+    return {
+        "success": True,
+        "domain": proposal.get("domain", "general"),
+        "fungible": result.get("fungible", "no"),
+        "proposal": proposal,
+        "metadata": metadata
+    }
+
+
+async def _stream_proposal(generator: DAOProposalGenerator, r: Optional[redis.Redis], req: DAOProposalInput, cache_key: str):
+    """NDJSON events for each workflow stage, ending with the same body the blocking path returns."""
+    try:
+        async with _generation_semaphore:
+            async for event in generator.run_stream(req):
+                if event["stage"] != "final":
+                    yield orjson.dumps(event) + b"\n"
+                    continue
+                result = {k: v for k, v in event.items() if k != "stage"}
+                if "error" not in result.get("proposal", {}):
+                    await _shared_cache_put(r, cache_key, result)
+                yield orjson.dumps({"stage": "final", **_proposal_response(req, result)}) + b"\n"
+    except UpstreamUnavailableError:
+        yield orjson.dumps({"stage": "error", **UPSTREAM_UNAVAILABLE}) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure as the last event
+        yield orjson.dumps({
+            "stage": "error",
+            "error": str(e),
+            "message": "Failed to generate proposal or complete voting process"
+        }) + b"\n"
+
+
+# Declared response models let FastAPI serialize through pydantic; streamed replies bypass them
+@app.post("/generate_proposal", response_model=ProposalResponse)
+async def generate_proposal(req: DAOProposalInput, request: Request, response: Response, stream: bool = False):
     """
     Generate full DAO proposal with multi-agent voting system.
     
-    Returns: complete proposal with voting results
+    Returns: complete proposal with voting results.
+    With ?stream=true, returns NDJSON events per workflow stage, the last one carrying the full response.
     """
     try:
-        result = await generator.run(req)
-        proposal = result.get("proposal", {})
-        
-        metadata = {
-            "voting_results": {
-                "final_decision": result.get("decision", "REJECTED"),
-                "weighted_score": result.get("weighted_score", 0.0),
-                "initial_votes": {
-                    "approve": result.get("voting_summary", {}).get("initial_approve", 0),
-                    "reject": result.get("voting_summary", {}).get("initial_reject", 0)
-                },
-                "final_votes": {
-                    "approve": result.get("voting_summary", {}).get("final_approve", 0),
-                    "reject": result.get("voting_summary", {}).get("final_reject", 0)
-                },
-                "votes_changed": result.get("voting_summary", {}).get("votes_changed", 0),
-                "debate_occurred": len(result.get("debate_arguments", [])) > 0
-            },
-            "proposal_details": {
-                "title": proposal.get("title", ""),
-                "abstract": proposal.get("abstract", ""),
-                "requested_funds": proposal.get("requested_funds"),
-                "proposer": proposal.get("proposer", req.proposer_wallet)
-            },
-            "validator_consensus": {
-                "confidence_levels": [
-                    {
-                        "validator": v.get("validator_id"),
-                        "role": v.get("role"),
-                        "confidence": v.get("confidence")
-                    }
-                    for v in result.get("final_votes", [])
-                ]
-            }
-        }
-        
-        return {
-            "success": True,
-            "domain": proposal.get("domain", "general"),
-            "fungible": result.get("fungible", "no"),
-            "proposal": proposal,
-            "metadata": metadata
-        }
+        cache_key = _result_cache_key(req)
+        r = request.app.state.redis
+        result = _result_cache_get(cache_key)
+        if result is None:
+            result = await _shared_cache_get(r, cache_key)
+        cache_status = "HIT" if result is not None else "MISS"
+        response.headers["X-Cache"] = cache_status
+        if result is None and _can_skip_workflow(req):
+            # The workflow would find nothing monetary either, so don't spend its LLM calls confirming it
+            result = _keyword_rejection(req)
+        elif result is None and stream:
+            return StreamingResponse(
+                _stream_proposal(request.app.state.generator, r, req, cache_key),
+                media_type="application/x-ndjson",
+                headers={"X-Cache": cache_status}
+            )
+        elif result is None:
+            result = await _run_coalesced(request.app.state.generator, cache_key, req)
+            # Failed generations are not cached so a retry gets a fresh attempt
+            if "error" not in result.get("proposal", {}):
+                await _shared_cache_put(r, cache_key, result)
+
+        body = _proposal_response(req, result)
+        if stream:
+            return StreamingResponse(
+                iter([orjson.dumps({"stage": "final", **body}) + b"\n"]),
+                media_type="application/x-ndjson",
+                headers={"X-Cache": cache_status}
+            )
+        return body
 
+    except UpstreamUnavailableError:
+        raise HTTPException(status_code=503, detail=UPSTREAM_UNAVAILABLE)
     except Exception as e:
+        logger.exception("Proposal generation failed")
         raise HTTPException(
             status_code=500,
             detail={
@@ -177,7 +511,6 @@ async def generate_proposal(req: DAOProposalInput):
             }
         )
 
-
 if __name__ == "__main__":
     import uvicorn
     print("=" * 80)
@@ -189,4 +522,24 @@ if __name__ == "__main__":
     print(" API Documentation: http://localhost:8080/docs")
     print("=" * 80)
     
-    uvicorn.run(app, host="127.0.0.1", port=8080)
+    # Each worker is its own process with its own generator and caches. Every worker needs at
+    # least one Gemini slot, so the count is clamped to the account caps, then exported so the
+    # worker processes' main.py splits those caps across exactly this many workers
+    workers = int(os.getenv("ML_WORKERS", os.cpu_count() or 1))
+    max_workers = min(GEMINI_MAX_CONCURRENCY, GEMINI_MAX_RPM)
+    if workers > max_workers:
+        logger.warning("Capping ML_WORKERS at %d to stay within the Gemini limits", max_workers)
+        workers = max_workers
+    os.environ["ML_WORKERS"] = str(workers)
+    # Access logging off by default: the app logs its own per-request lines. Loop and HTTP
+    # parser stay on "auto" (uvloop/httptools where available); a longer keep-alive avoids
+    # reconnects between health checks
+    uvicorn.run(
+        "server:app",
+        host="127.0.0.1",
+        port=8080,
+        workers=workers,
+        access_log=os.getenv("ACCESS_LOG", "0") == "1",
+        timeout_keep_alive=30,
+        log_level=os.getenv("UVICORN_LOG_LEVEL", "warning")
+    )